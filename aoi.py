@@ -0,0 +1,137 @@
+"""Area-of-interest polygons and their rasterization onto analysis grids.
+
+Polygons are lists of rings, each ring an ``(n, 2)`` array of
+``(lon, lat)`` vertices as in GeoJSON. Grids use the same
+``(south, north, n_rows, west, east, n_cols)`` tuple as ``geostats``.
+"""
+
+import json
+
+import numpy as np
+
+# Upper bound on grid rows/columns for an AOI, so large regions coarsen
+# instead of producing an unbounded number of cells
+MAX_AOI_GRID_SIZE = 200
+
+
+def parse_geojson(geojson):
+    """Extract polygons from a GeoJSON string or mapping
+
+    Accepts FeatureCollection, Feature, Polygon and MultiPolygon objects
+    (or a list of Features, as returned by ``st_folium`` drawings).
+    Other geometry types are ignored; malformed coordinates, or positions
+    outside [-180, 180] x [-90, 90], raise ValueError.
+    """
+    if isinstance(geojson, (str, bytes)):
+        geojson = json.loads(geojson)
+
+    if isinstance(geojson, list):
+        features = geojson
+    elif geojson.get('type') == 'FeatureCollection':
+        features = geojson.get('features', [])
+    else:
+        features = [geojson]
+
+    polygons = []
+    for feature in features:
+        geometry = feature.get('geometry', feature) if feature else None
+        if not geometry:
+            continue
+        if geometry.get('type') == 'Polygon':
+            parts = [geometry['coordinates']]
+        elif geometry.get('type') == 'MultiPolygon':
+            parts = geometry['coordinates']
+        else:
+            continue
+        for rings in parts:
+            polygon = []
+            for ring in rings:
+                ring = np.asarray(ring, dtype=float)
+                if ring.ndim != 2 or ring.shape[1] < 2:
+                    raise ValueError("polygon rings must be lists of [lon, lat] positions")
+                if not (np.all(np.abs(ring[:, 0]) <= 180) and
+                        np.all(np.abs(ring[:, 1]) <= 90)):
+                    raise ValueError("polygon positions must be [lon, lat] within "
+                                     "[-180, 180] x [-90, 90]")
+                if len(ring) >= 3:
+                    polygon.append(ring[:, :2])
+            if polygon:
+                polygons.append(polygon)
+    return polygons
+
+
+def to_geojson(polygons):
+    """FeatureCollection for a list of polygons"""
+    return {
+        'type': 'FeatureCollection',
+        'features': [{
+            'type': 'Feature',
+            'properties': {'zone': k},
+            'geometry': {
+                'type': 'Polygon',
+                'coordinates': [ring.tolist() for ring in polygon]
+            }
+        } for k, polygon in enumerate(polygons)]
+    }
+
+
+def bounds(polygons):
+    """(south, north, west, east) of all polygon vertices"""
+    points = np.concatenate([ring for polygon in polygons for ring in polygon])
+    return (float(points[:, 1].min()), float(points[:, 1].max()),
+            float(points[:, 0].min()), float(points[:, 0].max()))
+
+
+def aoi_grid(polygons, step):
+    """Grid of cell centres spaced ``step`` degrees covering the polygons
+
+    The spacing grows when needed to stay within MAX_AOI_GRID_SIZE cells
+    along the longer side of the bounding box.
+    """
+    south, north, west, east = bounds(polygons)
+    step = max(step, max(north - south, east - west) / (MAX_AOI_GRID_SIZE - 1))
+    # Rounding in the division can push ceil one past the longer side's limit
+    n_rows = min(int(np.ceil((north - south) / step)) + 1, MAX_AOI_GRID_SIZE)
+    n_cols = min(int(np.ceil((east - west) / step)) + 1, MAX_AOI_GRID_SIZE)
+    return (south, south + (n_rows - 1) * step, n_rows,
+            west, west + (n_cols - 1) * step, n_cols)
+
+
+def _scanline_fill(polygon, grid):
+    """Even-odd fill of one polygon (outer ring plus holes) on the grid"""
+    south, north, n_rows, west, east, n_cols = grid
+    dlat = (north - south) / max(n_rows - 1, 1)
+    dlon = (east - west) / max(n_cols - 1, 1)
+    row_lats = south + dlat * np.arange(n_rows)
+
+    # Every ring edge, from each vertex to the next (rings may or may not
+    # repeat their first vertex; a zero-length closing edge is harmless)
+    starts = np.concatenate(polygon)
+    ends = np.concatenate([np.roll(ring, -1, axis=0) for ring in polygon])
+    x0, y0 = starts[:, 0], starts[:, 1]
+    x1, y1 = ends[:, 0], ends[:, 1]
+
+    # Half-open test so a vertex on a scanline is counted once
+    y = row_lats[:, None]
+    crosses = (y0 <= y) != (y1 <= y)
+    rows, edges = np.nonzero(crosses)
+    t = (row_lats[rows] - y0[edges]) / (y1[edges] - y0[edges])
+    x = x0[edges] + t * (x1[edges] - x0[edges])
+
+    # Each crossing toggles inside/outside from the first cell centre east
+    # of it; the running parity along the row is the fill
+    cols = np.clip(np.ceil((x - west) / dlon), 0, n_cols).astype(np.intp)
+    toggles = np.zeros((n_rows, n_cols + 1), dtype=np.intp)
+    np.add.at(toggles, (rows, cols), 1)
+    return (np.cumsum(toggles, axis=1)[:, :n_cols] & 1).astype(bool)
+
+
+def rasterize(polygons, grid):
+    """Zone label per grid cell: polygon index inside, -1 outside
+
+    Where polygons overlap the later one wins.
+    """
+    labels = np.full((grid[2], grid[5]), -1, dtype=np.intp)
+    for k, polygon in enumerate(polygons):
+        labels[_scanline_fill(polygon, grid)] = k
+    return labels
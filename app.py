@@ -7,11 +7,18 @@ import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
 from streamlit_folium import st_folium
+from branca.element import Element, MacroElement
+from jinja2 import Template
 import json
 import time
+import hashlib
+from collections import OrderedDict
 from datetime import datetime, timedelta
 import io
 import base64
+from geostats import summarize_analysis, row_index, col_index
+from parallel import score_grid
+from aoi import parse_geojson, to_geojson, aoi_grid, rasterize, bounds
 
 # Page configuration
 st.set_page_config(
@@ -134,11 +141,98 @@ if 'current_lon' not in st.session_state:
     st.session_state.current_lon = 78.9629
 if 'current_analysis_type' not in st.session_state:
     st.session_state.current_analysis_type = "elevation"
+if 'map_stats' not in st.session_state:
+    st.session_state.map_stats = None
+if 'aoi_polygons' not in st.session_state:
+    st.session_state.aoi_polygons = None
+if 'keep_location' not in st.session_state:
+    st.session_state.keep_location = False
+if 'last_drawings' not in st.session_state:
+    st.session_state.last_drawings = None
+if 'map_drawing_session' not in st.session_state:
+    st.session_state.map_drawing_session = 0
+if 'map_layers' not in st.session_state:
+    st.session_state.map_layers = {}
+if 'map_view' not in st.session_state:
+    st.session_state.map_view = None
 
 # OpenTopography API configuration
 OPENTOPO_API_KEY = "f4f6840a5ff309df9554c11f74f83a66"  # Replace with actual API key
 OPENTOPO_BASE_URL = "https://cloud.sdsc.edu/v1/CommunityDEM"
 
+# Sample analysis grid: GRID_SIZE x GRID_SIZE points within ±GRID_HALF_SPAN degrees
+GRID_HALF_SPAN = 0.1
+GRID_SIZE = 50
+
+# Map display
+DEFAULT_CENTER = (20.5937, 78.9629)
+DEFAULT_ZOOM = 12
+MAP_WIDTH = 700
+
+# Risk classes produced by each analysis, lowest to highest
+RISK_LEVELS = {
+    "flood": ["Low", "Medium", "High"],
+    "fire": ["Low", "Moderate", "High", "Extreme"]
+}
+
+# Marker color for each class ("All" is the single elevation class)
+CLASS_COLORS = {
+    "Low": "green",
+    "Medium": "orange",
+    "Moderate": "orange",
+    "High": "red",
+    "Extreme": "darkred",
+    "All": "blue"
+}
+
+
+class LayerLegend(MacroElement):
+    """Legend control shown on the map while its parent layer is"""
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = L.control({position: 'bottomright'});
+        {{ this.get_name() }}.onAdd = function() {
+            var div = L.DomUtil.create('div');
+            div.innerHTML = {{ this.html|tojson }};
+            return div;
+        };
+        {{ this._parent.get_name() }}.on('add', function(e) {
+            {{ this.get_name() }}.addTo(e.target._map);
+        });
+        {{ this._parent.get_name() }}.on('remove', function() {
+            {{ this.get_name() }}.remove();
+        });
+        if ({{ this._parent.get_name() }}._map) {
+            {{ this.get_name() }}.addTo({{ this._parent.get_name() }}._map);
+        }
+        {% endmacro %}
+    """)
+
+    def __init__(self, html):
+        super().__init__()
+        self._name = "LayerLegend"
+        self.html = html
+
+
+def fix_element_ids(element, prefix):
+    """Replace the random ids of element and its descendants with fixed ones
+
+    Ids are hashed from each element's position in the tree (in the same hex
+    form folium uses), so rebuilding a layer from the same data renders
+    exactly the same script.
+    """
+    element._id = hashlib.md5(prefix.encode()).hexdigest()
+    # Popups and figures keep their content in separate sub-elements
+    parts = [part for part in (getattr(element, name, None)
+                               for name in ('header', 'html', 'script'))
+             if isinstance(part, Element)]
+    children = list(element._children.values())
+    for k, child in enumerate(children + parts):
+        fix_element_ids(child, f"{prefix}_{k}")
+    # Children are keyed by name, and some templates use the key as a variable
+    element._children = OrderedDict((child.get_name(), child) for child in children)
+    return element
+
 
 class GeoSpectreAI:
     def __init__(self):
@@ -177,94 +271,133 @@ class GeoSpectreAI:
             st.error(f"Error fetching elevation data: {str(e)}")
             return None
 
-    def create_sample_elevation_map(self, lat, lon, analysis_type="elevation"):
-        """Create a sample elevation map with realistic data"""
+    def sample_grid(self, lat, lon):
+        """Grid extents (south, north, rows, west, east, cols) around a point"""
+        return (lat - GRID_HALF_SPAN, lat + GRID_HALF_SPAN, GRID_SIZE,
+                lon - GRID_HALF_SPAN, lon + GRID_HALF_SPAN, GRID_SIZE)
+
+    def aoi_grid(self, polygons):
+        """Grid covering area-of-interest polygons at the sample grid spacing"""
+        return aoi_grid(polygons, 2 * GRID_HALF_SPAN / (GRID_SIZE - 1))
+
+    def create_sample_elevation_map(self, lat, lon, analysis_type="elevation",
+                                    grid=None, mask=None):
+        """Create a sample elevation map with realistic data
+
+        Only cells inside ``mask`` (a boolean array over ``grid``) are
+        generated; by default the whole sample grid around lat/lon is.
+        """
         # Create sample elevation data
-        lats = np.linspace(lat - 0.1, lat + 0.1, 50)
-        lons = np.linspace(lon - 0.1, lon + 0.1, 50)
-
-        # Generate realistic elevation data
-        elevation_data = []
-        for i, latitude in enumerate(lats):
-            for j, longitude in enumerate(lons):
-                # Simulate elevation with some noise
-                base_elevation = 100 + 50 * np.sin(i/10) + 30 * np.cos(j/8)
-                noise = np.random.normal(0, 10)
-                elevation = max(0, base_elevation + noise)
-                elevation_data.append([latitude, longitude, elevation])
-
-        return pd.DataFrame(elevation_data, columns=['lat', 'lon', 'elevation'])
-
-    def analyze_flood_risk(self, elevation_data, rainfall_factor=1.0):
+        south, north, n_rows, west, east, n_cols = grid or self.sample_grid(lat, lon)
+        lats = np.linspace(south, north, n_rows)
+        lons = np.linspace(west, east, n_cols)
+        if mask is None:
+            mask = np.ones((n_rows, n_cols), dtype=bool)
+        i, j = np.nonzero(mask)
+
+        # Simulate elevation with some noise
+        base_elevation = 100 + 50 * np.sin(i/10) + 30 * np.cos(j/8)
+        noise = np.random.normal(0, 10, size=len(i))
+        elevation = np.maximum(0, base_elevation + noise)
+
+        return pd.DataFrame({'lat': lats[i], 'lon': lons[j], 'elevation': elevation})
+
+    def score_cells(self, elevation_data, kernel, grid=None, seed=0, **params):
+        """Score each cell with a parallel.KERNELS kernel on its analysis grid
+
+        Cells are placed on the grid as a DEM (NaN where there is no data) and
+        scored in row bands; only the bands holding cells, such as those of
+        an area-of-interest mask, are scored. The app's grids are below
+        PARALLEL_MIN_CELLS, so they are scored in this process; worker
+        processes are only used when score_grid is given a larger DEM.
+        """
+        elevation = elevation_data['elevation'].to_numpy(dtype=float)
+        if grid is None:
+            return score_grid(kernel, elevation, seed=seed, **params)[0]
+
+        rows = row_index(elevation_data['lat'], grid)
+        cols = col_index(elevation_data['lon'], grid)
+        dem = np.full((grid[2], grid[5]), np.nan)
+        dem[rows, cols] = elevation
+        return score_grid(kernel, dem, seed=seed, **params)[rows, cols]
+
+    def analyze_flood_risk(self, elevation_data, rainfall_factor=1.0, grid=None):
         """Analyze flood risk based on elevation and rainfall"""
         # Lower elevations have higher flood risk
-        flood_risk = []
-        for _, row in elevation_data.iterrows():
-            # Normalize elevation
-            base_risk = max(0, 1 - (row['elevation'] / 200))
-            risk_with_rainfall = min(1, base_risk * rainfall_factor)
-
-            if risk_with_rainfall > 0.7:
-                risk_level = "High"
-                color = "red"
-            elif risk_with_rainfall > 0.4:
-                risk_level = "Medium"
-                color = "orange"
-            else:
-                risk_level = "Low"
-                color = "green"
-
-            flood_risk.append({
-                'lat': row['lat'],
-                'lon': row['lon'],
-                'risk_score': risk_with_rainfall,
-                'risk_level': risk_level,
-                'color': color
-            })
+        risk_score = self.score_cells(elevation_data, 'flood', grid,
+                                      rainfall_factor=rainfall_factor)
+
+        high, medium = risk_score > 0.7, risk_score > 0.4
+        return pd.DataFrame({
+            'lat': elevation_data['lat'].to_numpy(),
+            'lon': elevation_data['lon'].to_numpy(),
+            'risk_score': risk_score,
+            'risk_level': np.select([high, medium], ["High", "Medium"], "Low"),
+            'color': np.select([high, medium], ["red", "orange"], "green")
+        })
 
-        return pd.DataFrame(flood_risk)
-
-    def analyze_fire_danger(self, elevation_data, temperature_factor=1.0):
-        """Analyze fire danger based on elevation and temperature"""
-        fire_risk = []
-        for _, row in elevation_data.iterrows():
-            # Higher elevations and slopes increase fire risk
-            base_risk = (row['elevation'] / 300) * temperature_factor
-            risk_score = min(1, max(0, base_risk + np.random.normal(0, 0.1)))
-
-            if risk_score > 0.7:
-                risk_level = "Extreme"
-                color = "darkred"
-            elif risk_score > 0.5:
-                risk_level = "High"
-                color = "red"
-            elif risk_score > 0.3:
-                risk_level = "Moderate"
-                color = "orange"
-            else:
-                risk_level = "Low"
-                color = "green"
-
-            fire_risk.append({
-                'lat': row['lat'],
-                'lon': row['lon'],
-                'risk_score': risk_score,
-                'risk_level': risk_level,
-                'color': color
-            })
+    def analyze_fire_danger(self, elevation_data, temperature_factor=1.0,
+                            grid=None, seed=None):
+        """Analyze fire danger based on elevation and temperature
 
-        return pd.DataFrame(fire_risk)
+        The random variation is drawn per row band from ``seed``, so a given
+        seed gives the same map however many worker processes score it.
+        """
+        if seed is None:
+            seed = np.random.randint(2**31)
+        # Higher elevations and slopes increase fire risk
+        risk_score = self.score_cells(elevation_data, 'fire', grid, seed=seed,
+                                      temperature_factor=temperature_factor)
+
+        levels = [risk_score > 0.7, risk_score > 0.5, risk_score > 0.3]
+        return pd.DataFrame({
+            'lat': elevation_data['lat'].to_numpy(),
+            'lon': elevation_data['lon'].to_numpy(),
+            'risk_score': risk_score,
+            'risk_level': np.select(levels, ["Extreme", "High", "Moderate"], "Low"),
+            'color': np.select(levels, ["darkred", "red", "orange"], "green")
+        })
 
-    def create_interactive_map(self, data, lat, lon, analysis_type="elevation"):
-        """Create an interactive map using Folium"""
-        # Create base map
-        m = folium.Map(location=[lat, lon], zoom_start=12)
+    def create_base_map(self):
+        """Create the base map shared by every analysis
+
+        Its content never changes, so streamlit-folium keeps the same map
+        mounted across reruns; analyses are shown as feature group layers.
+        """
+        m = folium.Map(location=list(DEFAULT_CENTER), zoom_start=DEFAULT_ZOOM)
+
+        # Drawing tools for selecting an area of interest
+        plugins.Draw(
+            export=False,
+            draw_options={'polyline': False, 'circle': False,
+                          'marker': False, 'circlemarker': False}
+        ).add_to(m)
+
+        return m
+
+    def create_analysis_layer(self, data, analysis_type="elevation"):
+        """Create a feature group with the markers for one analysis"""
+        layer = folium.FeatureGroup(name=f"{analysis_type.title()} Analysis")
+
+        # Add legend
+        levels = RISK_LEVELS.get(analysis_type)
+        entries = [(CLASS_COLORS[level], f"{level} Risk") for level in reversed(levels)] \
+            if levels else [(CLASS_COLORS["All"], "Sample Point")]
+        legend_html = f"""
+        <div style="width: 150px; background-color: white; border:2px solid grey;
+                    font-size:14px; padding: 10px">
+        <h4>{analysis_type.title()} Analysis</h4>
+        {''.join(f'<p><i class="fa fa-circle" style="color:{color}"></i> {label}</p>'
+                 for color, label in entries)}
+        </div>
+        """
+        LayerLegend(legend_html).add_to(layer)
 
         if analysis_type == "elevation":
             # Add elevation heatmap
             heat_data = [[row['lat'], row['lon'], row['elevation']]
                          for _, row in data.iterrows()]
-            plugins.HeatMap(heat_data, radius=15, blur=25).add_to(m)
+            plugins.HeatMap(heat_data, radius=15, blur=25).add_to(layer)
 
             # Add contour lines
             for _, row in data.iterrows():
@@ -275,7 +408,7 @@ class GeoSpectreAI:
                     color='blue',
                     fill=True,
                     weight=1
-                ).add_to(m)
+                ).add_to(layer)
 
         elif analysis_type == "flood":
             # Add flood risk markers
@@ -287,7 +420,7 @@ class GeoSpectreAI:
                     color=row['color'],
                     fill=True,
                     weight=2
-                ).add_to(m)
+                ).add_to(layer)
 
         elif analysis_type == "fire":
             # Add fire danger markers
@@ -299,28 +432,72 @@ class GeoSpectreAI:
                     color=row['color'],
                     fill=True,
                     weight=2
-                ).add_to(m)
-
-        # Add legend
-        legend_html = f"""
-        <div style="position: fixed; 
-                    bottom: 50px; right: 50px; width: 150px; height: 90px; 
-                    background-color: white; border:2px solid grey; z-index:9999; 
-                    font-size:14px; padding: 10px">
-        <h4>{analysis_type.title()} Analysis</h4>
-        <p><i class="fa fa-circle" style="color:red"></i> High Risk</p>
-        <p><i class="fa fa-circle" style="color:orange"></i> Medium Risk</p>
-        <p><i class="fa fa-circle" style="color:green"></i> Low Risk</p>
-        </div>
-        """
-        m.get_root().html.add_child(folium.Element(legend_html))
-
-        return m
+                ).add_to(layer)
+
+        return fix_element_ids(layer, "analysis")
+
+    def create_aoi_layer(self, aoi):
+        """Create a feature group outlining the area of interest"""
+        layer = folium.FeatureGroup(name="Area of Interest")
+        folium.GeoJson(
+            to_geojson(aoi),
+            style_function=lambda feature: {
+                'color': '#667eea', 'weight': 2, 'fillOpacity': 0.05}
+        ).add_to(layer)
+        return fix_element_ids(layer, "aoi")
+
+    def map_view(self, lat, lon, aoi=None):
+        """Map center and zoom level showing the analysed area"""
+        if not aoi:
+            return (lat, lon), DEFAULT_ZOOM
+        south, north, west, east = bounds(aoi)
+        span = max(north - south, east - west, 1e-6)
+        # Web mercator tiles are 256px wide at zoom 0; fit the span in the map width
+        zoom = int(np.floor(np.log2(MAP_WIDTH * 360 / (256 * span))))
+        return ((south + north) / 2, (west + east) / 2), min(zoom, DEFAULT_ZOOM)
 
 
 # Initialize AI
 ai = GeoSpectreAI()
 
+
+def request_aoi_analysis():
+    """Queue a rerun of the current analysis type for the selected area"""
+    area = "my area of interest" if st.session_state.aoi_polygons else "the same location"
+    st.session_state.keep_location = True
+    st.session_state.messages.append({
+        "role": "user",
+        "content": f"Run {st.session_state.current_analysis_type} analysis for {area}"
+    })
+    st.session_state.map_generated = False
+    st.session_state.prevent_rerun = True
+
+
+def clear_drawings():
+    """Remove the shapes drawn on the map
+
+    The drawing tools keep their shapes in the browser, so the map component
+    is remounted under a new key.
+    """
+    st.session_state.map_drawing_session += 1
+    st.session_state.last_drawings = None
+
+
+def set_map_layer(name, build, *args):
+    """Add or replace a named map layer, built by ``build(*args)``
+
+    Only the inputs are kept: st_folium assigns ids to the feature groups it
+    renders, so each rerun needs freshly built layers to render the same
+    script as the last one.
+    """
+    st.session_state.map_layers[name] = (build, args)
+
+
+def remove_map_layer(name):
+    """Remove a named feature group layer from the map"""
+    st.session_state.map_layers.pop(name, None)
+
+
 # Header
 st.markdown("""
 <div class="main-header">
@@ -381,6 +558,32 @@ with col1:
             st.session_state.prevent_rerun = True
             st.session_state.current_progress = 0
 
+    # Area of interest: uploaded GeoJSON or a shape drawn on the map
+    with st.expander("📐 Area of Interest"):
+        aoi_file = st.file_uploader("Upload GeoJSON polygons",
+                                    type=["geojson", "json"], key="aoi_file")
+        if aoi_file is not None and st.button("Use uploaded area", key="aoi_upload_btn"):
+            try:
+                polygons = parse_geojson(aoi_file.getvalue())
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                polygons = None
+                st.error(f"Could not read GeoJSON: {str(e)}")
+            if polygons:
+                st.session_state.aoi_polygons = polygons
+                clear_drawings()
+                request_aoi_analysis()
+            elif polygons is not None:
+                st.warning("No polygons found in the uploaded file")
+
+        if st.session_state.aoi_polygons:
+            st.caption(f"{len(st.session_state.aoi_polygons)} polygon(s) selected")
+            if st.button("Clear area", key="aoi_clear_btn"):
+                st.session_state.aoi_polygons = None
+                clear_drawings()
+                request_aoi_analysis()
+        else:
+            st.caption("Draw a polygon or rectangle on the map, or upload a file")
+
     # Display chat messages
     for message in st.session_state.messages:
         if message["role"] == "user":
@@ -516,12 +719,45 @@ with col1:
             lat, lon = 30.7333, 76.7794
         elif "guwahati" in latest_message:
             lat, lon = 26.1445, 91.7362
+        elif st.session_state.keep_location:
+            # Re-running after the area of interest changed: stay in place
+            lat, lon = st.session_state.current_lat, st.session_state.current_lon
         else:
             lat, lon = 20.5937, 78.9629  # Default to India center
+        st.session_state.keep_location = False
 
-        # Store coordinates and analysis type in session state
+        # Store coordinates in session state
         st.session_state.current_lat = lat
         st.session_state.current_lon = lon
+
+        # An area of interest replaces the square around the city
+        aoi = st.session_state.aoi_polygons
+        if aoi:
+            location = "your area of interest"
+            grid = ai.aoi_grid(aoi)
+            zone_labels = rasterize(aoi, grid)
+            mask = zone_labels >= 0
+            zones = zone_labels[mask]
+            south, north, west, east = bounds(aoi)
+            lat, lon = (south + north) / 2, (west + east) / 2
+        else:
+            grid = ai.sample_grid(lat, lon)
+            mask = None
+            zones = None
+
+        if mask is not None and not mask.any():
+            # The area falls between grid cell centres, so there is nothing to analyze
+            st.session_state.aoi_polygons = None
+            clear_drawings()
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": "⚠️ That area is smaller than one grid cell, so there is nothing to analyze. Please draw or upload a larger area."
+            })
+            st.session_state.map_generated = True
+            st.session_state.prevent_rerun = False
+            st.rerun()
+
+        # Store analysis type in session state
         st.session_state.current_analysis_type = analysis_type
 
         # Add AI response
@@ -531,17 +767,33 @@ with col1:
 
         # Generate map data
         elevation_data = ai.create_sample_elevation_map(
-            lat, lon, analysis_type)
+            lat, lon, analysis_type, grid=grid, mask=mask)
 
         if analysis_type == "flood":
             st.session_state.current_map = ai.analyze_flood_risk(
-                elevation_data, rainfall_factor=1.2)
+                elevation_data, rainfall_factor=1.2, grid=grid)
         elif analysis_type == "fire":
             st.session_state.current_map = ai.analyze_fire_danger(
-                elevation_data, temperature_factor=1.1)
+                elevation_data, temperature_factor=1.1, grid=grid)
         else:
             st.session_state.current_map = elevation_data
 
+        # Replace only the layers this analysis changes
+        set_map_layer("analysis", ai.create_analysis_layer,
+                      st.session_state.current_map, analysis_type)
+        if aoi:
+            set_map_layer("aoi", ai.create_aoi_layer, aoi)
+        else:
+            remove_map_layer("aoi")
+        st.session_state.map_view = ai.map_view(lat, lon, aoi)
+
+        # Summarize once here so the Results tab only reads precomputed values
+        st.session_state.map_stats = summarize_analysis(
+            st.session_state.current_map,
+            grid,
+            RISK_LEVELS.get(analysis_type),
+            zones=zones)
+
         st.session_state.analysis_complete = True
         st.session_state.map_generated = True
         st.session_state.prevent_rerun = False
@@ -551,25 +803,47 @@ with col2:
     st.subheader("🗺️ Your Generated Map")
 
     if st.session_state.current_map is not None:
-        # Create and display map with stored coordinates and analysis type
-        map_obj = ai.create_interactive_map(
-            st.session_state.current_map,
-            st.session_state.current_lat,
-            st.session_state.current_lon,
-            st.session_state.current_analysis_type
-        )
+        # The base map stays the same; analysis layers, center and zoom are
+        # applied to it dynamically so the map isn't reloaded. Reruns that
+        # leave the layers unchanged reuse Streamlit's cached message, but any
+        # layer change still sends every layer plus the base map script again:
+        # about 2.5 MB for the 50x50 sample grid and 40 MB for a full 200x200
+        # area of interest (measured with map_benchmark.py)
+        base_map = ai.create_base_map()
+        center, zoom = st.session_state.map_view
+        layers = st.session_state.map_layers
 
         # Use a unique key and disable return_on_hover to prevent constant reruns
         map_data = st_folium(
-            map_obj,
-            width=700,
+            base_map,
+            width=MAP_WIDTH,
             height=500,
-            key="main_map",
+            key=f"main_map_{st.session_state.map_drawing_session}",
+            center=center,
+            zoom=zoom,
+            feature_group_to_add=[build(*args) for build, args in layers.values()],
+            layer_control=folium.LayerControl(collapsed=True),
             # Only return specific data
-            returned_objects=["last_object_clicked"],
+            returned_objects=["last_object_clicked", "all_drawings"],
             return_on_hover=False  # Disable hover events that trigger reruns
         )
 
+        # Newly drawn (or edited) shapes become the area of interest, and
+        # deleting every shape clears it
+        drawings = (map_data or {}).get("all_drawings")
+        previous = st.session_state.last_drawings or []
+        if drawings is not None and drawings != previous:
+            st.session_state.last_drawings = drawings
+            try:
+                polygons = parse_geojson([d for d in drawings if d not in previous])
+            except ValueError as e:
+                polygons = []
+                st.error(f"Could not use the drawn shape: {str(e)}")
+            if polygons or (not drawings and st.session_state.aoi_polygons):
+                st.session_state.aoi_polygons = polygons or None
+                request_aoi_analysis()
+                st.rerun()
+
         # Map controls
         col2a, col2b, col2c = st.columns(3)
         with col2a:
@@ -652,23 +926,10 @@ with col3:
     with tab3:
         st.subheader("Map Statistics")
 
-        if st.session_state.current_map is not None:
-            # Calculate statistics
-            if 'elevation' in st.session_state.current_map.columns:
-                area_covered = len(st.session_state.current_map) * 0.01
-                max_elevation = st.session_state.current_map['elevation'].max()
-                min_elevation = st.session_state.current_map['elevation'].min()
-                data_points = len(st.session_state.current_map)
-            elif 'risk_score' in st.session_state.current_map.columns:
-                area_covered = len(st.session_state.current_map) * 0.01
-                high_risk_count = len(
-                    st.session_state.current_map[st.session_state.current_map['risk_level'] == 'High'])
-                risk_percentage = (high_risk_count /
-                                   len(st.session_state.current_map)) * 100
-                data_points = len(st.session_state.current_map)
-            else:
-                area_covered = 0
-                data_points = 0
+        stats = st.session_state.map_stats
+        if stats is not None:
+            area_covered = stats['area_km2']
+            data_points = stats['data_points']
 
             # Display statistics
             col3a, col3b = st.columns(2)
@@ -682,17 +943,17 @@ with col3:
                 """, unsafe_allow_html=True)
 
             with col3b:
-                if 'risk_score' in st.session_state.current_map.columns:
+                if stats['value_column'] == 'risk_score':
                     st.markdown(f"""
                     <div class="stat-card">
-                        <div class="stat-value">{risk_percentage:.1f}%</div>
+                        <div class="stat-value">{stats['high_risk_pct']:.1f}%</div>
                         <div class="stat-label">high risk</div>
                     </div>
                     """, unsafe_allow_html=True)
                 else:
                     st.markdown(f"""
                     <div class="stat-card">
-                        <div class="stat-value">{max_elevation:.0f}m</div>
+                        <div class="stat-value">{stats['max_value']:.0f}m</div>
                         <div class="stat-label">max elevation</div>
                     </div>
                     """, unsafe_allow_html=True)
@@ -714,6 +975,39 @@ with col3:
                     <div class="stat-label">accuracy</div>
                 </div>
                 """, unsafe_allow_html=True)
+
+            # Area-weighted breakdown per class
+            st.dataframe(
+                stats['classes'][['class', 'area_km2', 'area_pct',
+                                  'mean', 'p10', 'p50', 'p90']].round(2),
+                hide_index=True
+            )
+
+            # Area-weighted histogram, stacked by class
+            edges = stats['histogram_edges']
+            bin_labels = [f"{lo:.2f}–{hi:.2f}" if stats['value_column'] == 'risk_score'
+                          else f"{lo:.0f}–{hi:.0f}m"
+                          for lo, hi in zip(edges[:-1], edges[1:])]
+            histogram_fig = go.Figure([
+                go.Bar(x=bin_labels, y=areas, name=name,
+                       marker_color=CLASS_COLORS.get(name, "gray"))
+                for name, areas in zip(stats['classes']['class'], stats['histogram'])
+            ])
+            histogram_fig.update_layout(
+                barmode='stack',
+                height=300,
+                margin=dict(l=0, r=0, t=30, b=0),
+                title="Area by value (sq km)",
+                legend=dict(orientation='h')
+            )
+            st.plotly_chart(histogram_fig)
+
+            # Per-polygon breakdown when several areas are selected
+            if stats['zones'] is not None and len(stats['zones']) > 1:
+                st.dataframe(
+                    stats['zones'][['zone', 'cells', 'area_km2', 'mean']].round(2),
+                    hide_index=True
+                )
         else:
             st.info("📊 Results will appear here after your map is generated")
 
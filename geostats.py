@@ -0,0 +1,186 @@
+"""Area-weighted statistics for GeoSpectre analysis grids.
+
+Grids are described by a ``(south, north, n_rows, west, east, n_cols)``
+tuple of cell-centre extents, matching the ``np.linspace`` sampling used
+to generate the analysis data.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# WGS84 ellipsoid
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+WGS84_E = np.sqrt(WGS84_F * (2 - WGS84_F))
+
+HIGH_RISK_LEVELS = ("High", "Extreme")
+PERCENTILES = (10, 50, 90)
+HISTOGRAM_BINS = 10
+
+
+def _authalic_q(lat_deg):
+    """Ellipsoidal area function q(phi) for latitude(s) in degrees"""
+    s = np.sin(np.radians(lat_deg))
+    es = WGS84_E * s
+    return s / (1 - es ** 2) + np.log((1 + es) / (1 - es)) / (2 * WGS84_E)
+
+
+@lru_cache(maxsize=64)
+def row_cell_areas(grid):
+    """Area in km² of one cell in each grid row on the WGS84 ellipsoid"""
+    south, north, n_rows, west, east, n_cols = grid
+    dlat = (north - south) / max(n_rows - 1, 1)
+    dlon = (east - west) / max(n_cols - 1, 1)
+
+    # Cell edges sit halfway between the sampled centres
+    edges = south - dlat / 2 + dlat * np.arange(n_rows + 1)
+    edges = np.clip(edges, -90.0, 90.0)
+    band = np.diff(_authalic_q(edges))
+    areas = WGS84_B ** 2 * np.radians(dlon) / 2 * band / 1e6
+    areas.setflags(write=False)
+    return areas
+
+
+def row_index(lats, grid):
+    """Grid row of each latitude"""
+    south, north, n_rows = grid[:3]
+    dlat = (north - south) / max(n_rows - 1, 1)
+    rows = np.rint((np.asarray(lats, dtype=float) - south) / dlat)
+    return np.clip(rows, 0, n_rows - 1).astype(np.intp)
+
+
+def col_index(lons, grid):
+    """Grid column of each longitude"""
+    west, east, n_cols = grid[3:]
+    dlon = (east - west) / max(n_cols - 1, 1)
+    cols = np.rint((np.asarray(lons, dtype=float) - west) / dlon)
+    return np.clip(cols, 0, n_cols - 1).astype(np.intp)
+
+
+def cell_areas(lats, grid):
+    """Area in km² of the cell centred on each latitude"""
+    return row_cell_areas(grid)[row_index(lats, grid)]
+
+
+def zonal_statistics(values, zones, weights=None, n_zones=None):
+    """Cell count, weight total and weighted mean/std of values per zone
+
+    ``zones`` holds non-negative integer labels; negative labels are
+    ignored. All reductions are single ``np.bincount`` passes.
+    """
+    values = np.asarray(values, dtype=float)
+    zones = np.asarray(zones, dtype=np.intp)
+    if weights is None:
+        weights = np.ones_like(values)
+    weights = np.asarray(weights, dtype=float)
+
+    keep = zones >= 0
+    values, zones, weights = values[keep], zones[keep], weights[keep]
+    if n_zones is None:
+        n_zones = int(zones.max()) + 1 if zones.size else 0
+
+    cells = np.bincount(zones, minlength=n_zones)
+    total = np.bincount(zones, weights=weights, minlength=n_zones)
+    wsum = np.bincount(zones, weights=weights * values, minlength=n_zones)
+    wsq = np.bincount(zones, weights=weights * values ** 2, minlength=n_zones)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = wsum / total
+        std = np.sqrt(np.maximum(wsq / total - mean ** 2, 0))
+
+    return pd.DataFrame({
+        'zone': np.arange(n_zones),
+        'cells': cells,
+        'area_km2': total,
+        'mean': mean,
+        'std': std,
+    })
+
+
+def _weighted_percentiles(values, zones, weights, n_zones, percentiles):
+    """Weighted percentiles of values within each zone (n_zones x len(percentiles))"""
+    order = np.lexsort((values, zones))
+    v, z, w = values[order], zones[order], weights[order]
+
+    counts = np.bincount(z, minlength=n_zones)
+    totals = np.bincount(z, weights=w, minlength=n_zones)
+    offsets = np.concatenate(([0.0], np.cumsum(totals)[:-1]))
+    ends = np.cumsum(counts) - 1
+
+    # Midpoint cumulative weight rank inside each zone lies in (0, 1), so
+    # zone + rank is monotonic across the whole sorted array
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rank = (np.cumsum(w) - w / 2 - offsets[z]) / totals[z]
+    key = z + rank
+
+    q = np.asarray(percentiles, dtype=float) / 100
+    targets = np.arange(n_zones)[:, None] + q[None, :]
+    idx = np.searchsorted(key, targets.ravel()).reshape(targets.shape)
+    idx = np.minimum(idx, ends[:, None])
+
+    result = np.full(targets.shape, np.nan)
+    present = counts > 0
+    result[present] = v[idx[present]]
+    return result
+
+
+def summarize_analysis(data, grid, levels=None, zones=None):
+    """Precompute the Results tab summary for an analysis DataFrame
+
+    Risk analyses are grouped by ``risk_level`` (ordered by ``levels``)
+    and weighted by cell area; elevation data is treated as one class.
+    ``zones`` optionally labels each row with an area-of-interest index
+    for a per-zone breakdown.
+    """
+    value_column = 'risk_score' if 'risk_score' in data.columns else 'elevation'
+    values = data[value_column].to_numpy(dtype=float)
+    areas = cell_areas(data['lat'].to_numpy(), grid)
+
+    if 'risk_level' in data.columns:
+        labels = pd.Categorical(data['risk_level'], categories=levels)
+        classes = list(labels.categories)
+        codes = labels.codes.astype(np.intp)
+        edges = np.linspace(0, 1, HISTOGRAM_BINS + 1)
+    else:
+        classes = ["All"]
+        codes = np.zeros(len(values), dtype=np.intp)
+        lo, hi = (values.min(), values.max()) if len(values) else (0.0, 1.0)
+        edges = np.linspace(lo, hi if hi > lo else lo + 1, HISTOGRAM_BINS + 1)
+    n_classes = len(classes)
+
+    table = zonal_statistics(values, codes, areas, n_classes)
+    table.insert(0, 'class', classes)
+    table = table.drop(columns='zone')
+    total_area = float(areas.sum())
+    table['area_pct'] = table['area_km2'] / total_area * 100 if total_area else 0.0
+
+    keep = codes >= 0
+    pct = _weighted_percentiles(values[keep], codes[keep], areas[keep],
+                                n_classes, PERCENTILES)
+    for k, p in enumerate(PERCENTILES):
+        table[f'p{p}'] = pct[:, k]
+
+    bins = np.clip(np.searchsorted(edges, values[keep], side='right') - 1,
+                   0, HISTOGRAM_BINS - 1)
+    histogram = np.bincount(codes[keep] * HISTOGRAM_BINS + bins,
+                            weights=areas[keep],
+                            minlength=n_classes * HISTOGRAM_BINS)
+
+    high = table['class'].isin(HIGH_RISK_LEVELS)
+    if zones is not None:
+        zones = zonal_statistics(values, zones, areas)
+
+    return {
+        'value_column': value_column,
+        'data_points': len(data),
+        'area_km2': total_area,
+        'high_risk_pct': float(table.loc[high, 'area_pct'].sum()),
+        'max_value': float(values.max()) if len(values) else 0.0,
+        'classes': table,
+        'histogram_edges': edges,
+        'histogram': histogram.reshape(n_classes, HISTOGRAM_BINS),
+        'zones': zones,
+    }
@@ -0,0 +1,79 @@
+"""Measure how much map data the app sends to the browser on each rerun.
+
+Drives ``app.py`` through a short session with Streamlit's AppTest and
+reports the size of the streamlit-folium component arguments after each
+step. Streamlit replaces an element identical to the previous run's with
+a cached reference, so a rerun that leaves the map unchanged sends
+nothing; any change to a layer sends every layer plus the base map
+script again.
+
+Run ``python map_benchmark.py`` from the repository root.
+"""
+
+import json
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from aoi import parse_geojson
+
+# A strip of Kerala, used as a sample area of interest
+SAMPLE_AOI = {
+    'type': 'Polygon',
+    'coordinates': [[[75.0, 12.0], [75.1, 12.0], [76.1, 10.0],
+                     [76.0, 10.0], [75.0, 12.0]]]
+}
+
+
+def _map_args(at):
+    """Component arguments of the map, or None if it isn't shown"""
+    maps = at.get('component_instance')
+    return maps[0].proto.json_args if maps else None
+
+
+def _set_aoi(at, geojson):
+    at.session_state.aoi_polygons = parse_geojson(geojson)
+
+
+def benchmark(app='app.py'):
+    """Map payload per step of a sample session
+
+    Returns [(step, total_bytes, layer_bytes, sent_bytes), ...] where
+    ``sent_bytes`` is 0 when the map is unchanged from the previous rerun
+    and could be served from Streamlit's message cache.
+    """
+    min_cached = st.get_option('global.minCachedMessageSize')
+    steps = [
+        ("elevation", lambda at: (at.text_area(key='user_input').input(
+            "Show elevation near Delhi"), at.button(key='send_btn').click())),
+        ("unrelated button", lambda at: at.button(key='share_map').click()),
+        ("flood", lambda at: at.button(key='flood_btn').click()),
+        ("fire", lambda at: at.button(key='fire_btn').click()),
+        ("area of interest", lambda at: (_set_aoi(at, SAMPLE_AOI),
+                                         at.button(key='flood_btn').click())),
+        ("unrelated button", lambda at: at.button(key='share_map').click()),
+        ("clear area", lambda at: at.button(key='aoi_clear_btn').click()),
+    ]
+
+    at = AppTest.from_file(app, default_timeout=300)
+    at.run()
+    results = []
+    previous = None
+    for name, action in steps:
+        action(at)
+        at.run()
+        if at.exception:
+            raise RuntimeError(f"{name}: {at.exception[0].message}")
+        args = _map_args(at)
+        layers = json.loads(args).get('feature_group') or ''
+        cached = args == previous and len(args) >= min_cached
+        results.append((name, len(args), len(layers), 0 if cached else len(args)))
+        previous = args
+    return results
+
+
+if __name__ == '__main__':
+    print(f"{'step':<18} {'map':>10} {'layers':>10} {'sent':>10}")
+    for name, total, layers, sent in benchmark():
+        print(f"{name:<18} {total / 1e6:8.2f}MB {layers / 1e6:8.2f}MB "
+              f"{sent / 1e6:8.2f}MB")
@@ -0,0 +1,210 @@
+"""Banded multi-process scoring of gridded DEMs.
+
+The DEM is copied once into ``multiprocessing.shared_memory``; worker
+processes attach to it without copying, score fixed-size row bands
+(reading extra halo rows where a kernel looks at neighbouring cells) and
+write into a shared output buffer. Bands have a fixed height and each
+draws its random numbers from a stream seeded by ``(seed, band index)``,
+so results do not depend on how many workers run.
+
+Run ``python parallel.py`` to report the speedup from 1 to N cores.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+
+# Rows per band; fixed so random streams don't depend on the worker count
+BAND_ROWS = 64
+
+# Below this many cells the process start-up costs more than it saves.
+# The app's own grids stay below it (at most aoi.MAX_AOI_GRID_SIZE squared,
+# 40,000 cells, which take well under a millisecond to score), so worker
+# processes are only used for larger DEMs scored directly with score_grid.
+PARALLEL_MIN_CELLS = 250_000
+
+# Worker pool, kept alive between calls so processes start once; it is
+# replaced when a different number of workers is requested
+_pool = None
+_pool_workers = 0
+
+
+def _flood_kernel(dem, rng, rainfall_factor=1.0):
+    """Flood risk: lower elevations and more rainfall raise the risk"""
+    base_risk = np.maximum(0, 1 - dem / 200)
+    return np.minimum(1, base_risk * rainfall_factor)
+
+
+def _fire_kernel(dem, rng, temperature_factor=1.0):
+    """Fire danger: higher elevations and temperatures raise the danger"""
+    base_risk = (dem / 300) * temperature_factor
+    noise = rng.normal(0, 0.1, size=dem.shape)
+    return np.clip(base_risk + noise, 0, 1)
+
+
+def _slope_kernel(dem, rng, cell_size_m=(1.0, 1.0)):
+    """Slope in degrees from central differences (needs a one-row halo)"""
+    dz_dy, dz_dx = np.gradient(dem, *cell_size_m)
+    return np.degrees(np.arctan(np.hypot(dz_dx, dz_dy)))
+
+
+# Scoring kernels and the halo rows each needs on either side of a band
+KERNELS = {
+    'flood': (_flood_kernel, 0),
+    'fire': (_fire_kernel, 0),
+    'slope': (_slope_kernel, 1),
+}
+
+
+def _attach(name):
+    """Attach to an existing shared memory block owned by the parent"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 attaching also registers the block, but with
+        # the parent's resource tracker, which the parent's unlink clears
+        return shared_memory.SharedMemory(name=name)
+
+
+def _score_band(dem, out, band, kernel, seed, params):
+    """Score one row band of dem into out"""
+    function, halo = KERNELS[kernel]
+    n_rows = dem.shape[0]
+    start = band * BAND_ROWS
+    stop = min(start + BAND_ROWS, n_rows)
+    lo, hi = max(0, start - halo), min(n_rows, stop + halo)
+
+    rng = np.random.default_rng([seed, band])
+    with np.errstate(invalid='ignore'):
+        scores = function(dem[lo:hi], rng, **params)
+    out[start:stop] = scores[start - lo:stop - lo]
+
+
+def _score_band_shared(task):
+    """Worker entry point: attach to the shared arrays and score one band"""
+    dem_name, out_name, shape, band, kernel, seed, params = task
+    dem_shm, out_shm = _attach(dem_name), _attach(out_name)
+    try:
+        dem = np.ndarray(shape, dtype=np.float64, buffer=dem_shm.buf)
+        out = np.ndarray(shape, dtype=np.float64, buffer=out_shm.buf)
+        _score_band(dem, out, band, kernel, seed, params)
+    finally:
+        del dem, out
+        dem_shm.close()
+        out_shm.close()
+    return band
+
+
+def _get_pool(workers):
+    """Process pool with the given number of workers, created on first use"""
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        shutdown_pool()
+        # Spawn rather than fork: the Streamlit server process is threaded
+        _pool = ProcessPoolExecutor(max_workers=workers,
+                                    mp_context=get_context('spawn'))
+        _pool_workers = workers
+    return _pool
+
+
+def shutdown_pool():
+    """Stop the worker processes, if any are running"""
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.shutdown()
+        _pool, _pool_workers = None, 0
+
+
+def score_grid(kernel, dem, seed=0, workers=None, **params):
+    """Score a 2-D elevation grid with one of KERNELS
+
+    Cells that are NaN in ``dem`` (e.g. outside an area of interest) stay
+    NaN, and bands with no other cells are skipped. ``workers`` defaults to
+    one per CPU for grids of at least PARALLEL_MIN_CELLS cells; smaller
+    grids, or ``workers=1``, are scored band by band in this process with
+    identical results.
+    """
+    dem = np.asarray(dem, dtype=np.float64)
+    if dem.ndim == 1:
+        dem = dem[None, :]
+    # Band numbers stay those of the full grid, so skipping bands doesn't
+    # change the random streams of the others
+    bands = np.unique(np.nonzero(np.isfinite(dem).any(axis=1))[0] // BAND_ROWS)
+
+    if workers is None:
+        workers = os.cpu_count() if dem.size >= PARALLEL_MIN_CELLS else 1
+    workers = max(1, min(workers, len(bands)))
+
+    if workers == 1:
+        out = np.full_like(dem, np.nan)
+        for band in bands:
+            _score_band(dem, out, int(band), kernel, seed, params)
+        return out
+
+    dem_shm = shared_memory.SharedMemory(create=True, size=max(dem.nbytes, 1))
+    out_shm = shared_memory.SharedMemory(create=True, size=max(dem.nbytes, 1))
+    try:
+        np.ndarray(dem.shape, dtype=np.float64, buffer=dem_shm.buf)[:] = dem
+        np.ndarray(dem.shape, dtype=np.float64, buffer=out_shm.buf)[:] = np.nan
+        tasks = [(dem_shm.name, out_shm.name, dem.shape, int(band), kernel, seed, params)
+                 for band in bands]
+        list(_get_pool(workers).map(_score_band_shared, tasks))
+
+        return np.ndarray(dem.shape, dtype=np.float64, buffer=out_shm.buf).copy()
+    finally:
+        dem_shm.close()
+        dem_shm.unlink()
+        out_shm.close()
+        out_shm.unlink()
+
+
+def benchmark(shape=(4000, 4000), max_workers=None, repeat=3):
+    """Time each kernel on a synthetic DEM with 1..max_workers processes
+
+    Returns {kernel: [(workers, seconds, speedup), ...]} and checks that
+    every worker count gives the same result. Timings are the best of
+    ``repeat`` runs after the worker pool has started.
+    """
+    max_workers = max_workers or os.cpu_count()
+    i, j = np.indices(shape)
+    dem = 100 + 50 * np.sin(i / 10) + 30 * np.cos(j / 8)
+    params = {
+        'flood': {'rainfall_factor': 1.2},
+        'fire': {'temperature_factor': 1.1},
+        'slope': {'cell_size_m': (30.0, 30.0)},
+    }
+
+    results = {kernel: [] for kernel in KERNELS}
+    references = {}
+    try:
+        # Worker counts in the outer loop so each pool size starts only once
+        for workers in range(1, max_workers + 1):
+            if workers > 1:
+                # Keep every worker busy briefly so all processes have started
+                list(_get_pool(workers).map(time.sleep, [0.2] * workers))
+            for kernel, timings in results.items():
+                best = float('inf')
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    out = score_grid(kernel, dem, seed=42, workers=workers,
+                                     **params[kernel])
+                    best = min(best, time.perf_counter() - started)
+                reference = references.setdefault(kernel, out)
+                if not np.array_equal(out, reference, equal_nan=True):
+                    raise RuntimeError(f"{kernel} differs with {workers} workers")
+                timings.append((workers, best, timings[0][1] / best if timings else 1.0))
+    finally:
+        shutdown_pool()
+    return results
+
+
+if __name__ == '__main__':
+    print(f"Banded scoring speedup on {os.cpu_count()} CPU(s), "
+          f"{BAND_ROWS}-row bands")
+    for kernel, timings in benchmark().items():
+        for workers, seconds, speedup in timings:
+            print(f"{kernel:>6} {workers:>3} worker(s): {seconds:7.3f}s  "
+                  f"{speedup:5.2f}x")